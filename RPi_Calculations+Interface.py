@@ -17,6 +17,8 @@
 # 1.5       20.09.2018  M7ma    added orbit visualization, menu redesign
 # 2.0       12.10.2018  M7ma    new user interface, added stars and galaxies
 # 2.1       11.05.2019  M7ma    more precision thanks to AstroPy
+# 2.2       19.10.2026  agent   offline IERS and leap second tables
+# 2.3       19.10.2026  agent   slim mode without AstroPy, array tables
 #
 # Copyright © Michael Siebenmann, Matzingen, Switzerland. All rights reserved
 # -----------------------------------------------------------------------------
@@ -26,7 +28,12 @@
 # -----------------------------------------------------------------------------
 
 import os
+import sys
 import time
+import shutil
+import tempfile
+import threading
+import array
 import Adafruit_CharLCD as LCD
 import datetime, math
 import serial
@@ -34,10 +41,122 @@ import gpsd
 from pytz import timezone
 from time import sleep
 
-from astropy.coordinates import EarthLocation, SkyCoord
-from astropy.time import Time
-from astropy import units as u
-from astropy.coordinates import AltAz
+# Command line flags:
+#   --slim          never import AstroPy, which needs a large part of the RPi's
+#                   RAM. Alt/Az are then calculated directly from RA, Dec and
+#                   the local sidereal time.
+#   --update-iers   install new IERS / leap second tables and exit
+#   --profile       trace memory to report the allocations of every update
+
+slim        = "--slim" in sys.argv
+update_iers = "--update-iers" in sys.argv
+profile     = "--profile" in sys.argv
+
+if profile:
+    import tracemalloc
+    tracemalloc.start()
+
+# -----------------------------------------------------------------------------
+# IERS Data
+# -----------------------------------------------------------------------------
+
+# The device has no network in the field, so AstroPy must never try to
+# download IERS or leap second tables. Both are loaded from local files in
+# iers_dir instead; without them AstroPy's bundled (older) tables are used.
+
+iers_dir        = os.path.join(os.path.dirname(os.path.abspath(__file__)), "iers")
+iers_file       = os.path.join(iers_dir, "finals2000A.all")
+leap_file       = os.path.join(iers_dir, "Leap_Second.dat")
+iers_ready      = threading.Event()
+
+# Leap second tables come as IERS Leap_Second.dat or IETF leap-seconds.list,
+# try both formats
+
+def read_leap_seconds(path):
+    from astropy.utils import iers
+    try:
+        return iers.LeapSeconds.from_iers_leap_seconds(path)
+    except Exception:
+        return iers.LeapSeconds.from_leap_seconds_list(path)
+
+# Install new tables (e.g. from a USB stick) into iers_dir. The type of each
+# file is detected by parsing it, only valid tables replace the current ones.
+# Usage:
+# python3 RPi_Calculations+Interface.py --update-iers finals2000A.all Leap_Second.dat
+
+def update_iers_data(files):
+    if not files:
+        print("Usage: --update-iers <finals2000A.all> <Leap_Second.dat>")
+        return False
+    from astropy.utils import iers
+    os.makedirs(iers_dir, exist_ok = True)
+    isValid = True
+    installed = []
+    for f in files:
+        if not os.path.isfile(f):
+            print(f + ": file not found")
+            isValid = False
+            continue
+        fd, tmp = tempfile.mkstemp(dir = iers_dir)
+        os.close(fd)
+        try:
+            shutil.copyfile(f, tmp)
+            try:
+                table = read_leap_seconds(tmp)
+                target = leap_file
+            except Exception:
+                table = iers.IERS_A.open(tmp)
+                target = iers_file
+            if (len(table) == 0):
+                raise ValueError("empty table")
+            if (target in installed):
+                raise ValueError("second file for " + target)
+            os.chmod(tmp, 0o644) # mkstemp creates the file readable by its owner only
+            os.replace(tmp, target)
+            installed.append(target)
+            print(f + " -> " + target)
+        except Exception as error:
+            os.remove(tmp)
+            print(f + ": not a valid table, " + repr(error))
+            isValid = False
+    return isValid
+
+if update_iers:
+    files = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    sys.exit(0 if update_iers_data(files) else 1)
+
+# Needs AstroPy >= 5.0 (earth_orientation_table, iers_degraded_accuracy)
+
+if not slim:
+    from astropy.coordinates import EarthLocation, SkyCoord
+    from astropy.time import Time
+    from astropy import units as u
+    from astropy.coordinates import AltAz
+    from astropy.utils import iers
+    import erfa
+
+    iers.conf.auto_download = False
+    iers.conf.auto_max_age = None
+    iers.conf.iers_degraded_accuracy = "warn"
+
+def load_iers_data():
+    try:
+        if os.path.isfile(iers_file):
+            iers.earth_orientation_table.set(iers.IERS_A.open(iers_file))
+            print("IERS table loaded from " + iers_file)
+        else:
+            print("No local IERS table, using bundled IERS-B")
+        if os.path.isfile(leap_file):
+            erfa.leap_seconds.update(read_leap_seconds(leap_file))
+            print("Leap seconds loaded from " + leap_file)
+    except Exception as error:
+        print("Could not load IERS data: " + repr(error))
+    iers_ready.set()
+
+if not slim:
+    threading.Thread(target = load_iers_data, daemon = True).start()
+else:
+    iers_ready.set() # nothing to load
 
 # -----------------------------------------------------------------------------
 # Setup
@@ -69,6 +188,61 @@ solar_system = ("Sonne", "Mond", "Merkur", "Venus", "Mars", "Jupiter", "Saturn",
 star_list = ("Sirius", "Alpha Centauri A", "Arcturus", "Vega", "Aldebaran", "Capella", "Regulus", "Altair", "Rigel")
 galaxy_list = ("Andromeda", "Gr. Magel. Wolke", "Kl. Magel. Wolke", "Dreiecksnebel", "Bodes Galaxie", "Centaurus A", "Zigarrengalaxie", "Sombrerogalaxie", "Virgo A")
 
+# Orbital elements N, i, w, a, e, M in the order of solar_system, stored as
+# value at the epoch (orbit_base) and change per day (orbit_rate). Flat arrays
+# instead of dicts of tuples, so no objects are created per update.
+
+orbit_base = array.array('d', (
+      0.0,      0.0,    282.9404,  1.000000, 0.016709, 356.0470, # Sonne
+    125.1228,   5.1454, 318.0634, 60.2666,   0.054900, 115.3654, # Mond
+     48.3313,   7.0047,  29.1241,  0.387098, 0.205635, 168.6562, # Merkur
+     76.6799,   3.3946,  54.8910,  0.723330, 0.006773,  48.0052, # Venus
+     49.5574,   1.8497, 286.5016,  1.523688, 0.093405,  18.6021, # Mars
+    100.4542,   1.3030, 273.8777,  5.20256,  0.048498,  19.8950, # Jupiter
+    113.6634,   2.4886, 339.3939,  9.55475,  0.055546, 316.9670, # Saturn
+     74.0005,   0.7733,  96.6612, 19.18171,  0.047318, 142.5905, # Uranus
+    131.7806,   1.7700, 272.8461, 30.05826,  0.008606, 260.2471  # Neptun
+))
+
+orbit_rate = array.array('d', (
+    0.0,           0.0,       4.70935E-5,  0.0,       -1.151E-9, 0.9856002585,  # Sonne
+    -0.0529538083, 0.0,       0.1643573223, 0.0,       0.0,      13.0649929509, # Mond
+    3.24587E-5,    5.00E-8,   1.01444E-5,  0.0,        5.59E-10, 4.0923344368,  # Merkur
+    2.46590E-5,    2.75E-8,   1.38374E-5,  0.0,       -1.302E-9, 1.6021302244,  # Venus
+    2.11081E-5,   -1.78E-8,   2.92961E-5,  0.0,        2.516E-9, 0.5240207766,  # Mars
+    2.76854E-5,   -1.557E-7,  1.64505E-5,  0.0,        4.469E-9, 0.0830853001,  # Jupiter
+    2.38980E-5,   -1.081E-7,  2.97661E-5,  0.0,       -9.499E-9, 0.0334442282,  # Saturn
+    1.3978E-5,     1.9E-8,    3.0565E-5,  -1.55E-8,    7.45E-9,  0.011725806,   # Uranus
+    3.0173E-5,    -2.55E-7,  -6.027E-6,    3.313E-8,   2.15E-9,  0.005995147    # Neptun
+))
+
+# RA and Dec of the selected stars and galaxies, in the order of star_list
+# and galaxy_list
+
+star_coords = array.array('d', (
+    101.5,    -16.74497,  # Sirius
+    219.9,    -60.83389,  # Alpha Centauri A
+    214.1333,  19.0835,   # Arcturus
+    279.3958,  38.080389, # Vega
+    69.2542,   16.54503,  # Aldebaran
+    79.525,    46.01411,  # Capella
+    152.3458,  11.87286,  # Regulus
+    297.9292,   8.921056, # Altair
+    78.8625,   -8.182111  # Rigel
+))
+
+galaxy_coords = array.array('d', (
+    10.95,     41.37297,  # Andromeda
+    80.8542,  -69.74044,  # Gr. Magel. Wolke
+    13.3208,  -72.69078,  # Kl. Magel. Wolke
+    23.7333,   30.75689,  # Dreiecksnebel
+    149.4583,  68.97347,  # Bodes Galaxie
+    201.6458, -43.11758,  # Centaurus A
+    149.3583,  69.58781,  # Zigarrengalaxie
+    190.2458, -11.7275,   # Sombrerogalaxie
+    187.9458,  12.28597   # Virgo A
+))
+
 lcd = LCD.Adafruit_CharLCDPlate() # Initialize the LCD using the pins
 lcd.clear()
 
@@ -81,6 +255,18 @@ def shutdown():
     lcd.set_backlight(0)
     os.system("sudo poweroff") # Shutdown the RPi
 
+# Resident memory of this process in kB, to compare slim and full mode
+
+def get_rss():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
 # Get user's desired mode
 
 def get_mode():
@@ -315,6 +501,15 @@ def get_alt_az(p, y):
         date = speed_date
         time_str = speed_time
         
+    # Measure only the calculation, not the user input above, and not while
+    # the IERS tables are still loading in the background
+    
+    measure = profile and iers_ready.is_set()
+    if measure:
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        traced = tracemalloc.get_traced_memory()[0]
+    
     datediff = date - dayepoch
     d = datediff.days + 1
     timediff = time_str - timeepoch
@@ -323,104 +518,11 @@ def get_alt_az(p, y):
     d += diff_ind
     UT = diff_ind * 24
 
-    # Orbital elements
-
-    ref = {
-        "Sonne":   (0.0,
-                    0.0,
-                    282.9404 + 4.70935E-5 * d,
-                    1.000000,
-                    0.016709 - 1.151E-9 * d,
-                    356.0470 + 0.9856002585 * d),
-           
-        "Mond":    (125.1228 - 0.0529538083 * d,
-                    5.1454,
-                    318.0634 + 0.1643573223 * d,
-                    60.2666,
-                    0.054900,
-                    115.3654 + 13.0649929509 * d),
-
-        "Merkur":  (48.3313 + 3.24587E-5 * d,
-                    7.0047 + 5.00E-8 * d,
-                    29.1241 + 1.01444E-5 * d,
-                    0.387098,
-                    0.205635 + 5.59E-10 * d,
-                    168.6562 + 4.0923344368 * d),
-
-        "Venus":   (76.6799 + 2.46590E-5 * d,
-                    3.3946 + 2.75E-8 * d,
-                    54.8910 + 1.38374E-5 * d,
-                    0.723330,
-                    0.006773 - 1.302E-9 * d,
-                    48.0052 + 1.6021302244 * d),
-
-        "Mars":    (49.5574 + 2.11081E-5 * d,
-                    1.8497 - 1.78E-8 * d,
-                    286.5016 + 2.92961E-5 * d,
-                    1.523688,
-                    0.093405 + 2.516E-9 * d,
-                    18.6021 + 0.5240207766 * d),
-
-        "Jupiter": (100.4542 + 2.76854E-5 * d,
-                    1.3030 - 1.557E-7 * d,
-                    273.8777 + 1.64505E-5 * d,
-                    5.20256,
-                    0.048498 + 4.469E-9 * d,
-                    19.8950 + 0.0830853001 * d),
-
-        "Saturn":  (113.6634 + 2.38980E-5 * d,
-                    2.4886 - 1.081E-7 * d,
-                    339.3939 + 2.97661E-5 * d,
-                    9.55475,
-                    0.055546 - 9.499E-9 * d,
-                    316.9670 + 0.0334442282 * d),
-
-        "Uranus":  (74.0005 + 1.3978E-5 * d,
-                    0.7733 + 1.9E-8 * d,
-                    96.6612 + 3.0565E-5 * d,
-                    19.18171 - 1.55E-8 * d,
-                    0.047318 + 7.45E-9 * d,
-                    142.5905 + 0.011725806 * d),
-
-        "Neptun":  (131.7806 + 3.0173E-5 * d,
-                    1.7700 - 2.55E-7 * d,
-                    272.8461 - 6.027E-6 * d,
-                    30.05826 + 3.313E-8 * d,
-                    0.008606 + 2.15E-9 * d,
-                    260.2471 + 0.005995147 * d)
-    }
-    
-    # RA and Dec of the selected stars and galaxies
-    
-    stars = {
-        "Sirius": (101.5, -16.74497),
-        "Alpha Centauri A": (219.9, -60.83389),
-        "Arcturus": (214.1333, 19.0835),
-        "Vega": (279.3958, 38.080389),
-        "Aldebaran": (69.2542, 16.54503),
-        "Capella": (79.525, 46.01411),
-        "Regulus": (152.3458, 11.87286),
-        "Altair": (297.9292, 8.921056),
-        "Rigel": (78.8625, -8.182111)
-    }
-    
-    galaxies = {
-        "Andromeda": (10.95, 41.37297),
-        "Gr. Magel. Wolke": (80.8542, -69.74044),
-        "Kl. Magel. Wolke": (13.3208, -72.69078),
-        "Dreiecksnebel": (23.7333, 30.75689),
-        "Bodes Galaxie": (149.4583, 68.97347),
-        "Centaurus A": (201.6458, -43.11758),
-        "Zigarrengalaxie": (149.3583, 69.58781),
-        "Sombrerogalaxie": (190.2458, -11.7275),
-        "Virgo A": (187.9458, 12.28597)
-    }
-
     # Sun's orbital elements
 
-    ws = math.radians(ref["Sonne"][2]%360)
-    es = ref["Sonne"][4]
-    Ms = math.radians(ref["Sonne"][5]%360)
+    ws = math.radians((orbit_base[2] + orbit_rate[2] * d)%360)
+    es = orbit_base[4] + orbit_rate[4] * d
+    Ms = math.radians((orbit_base[5] + orbit_rate[5] * d)%360)
     
     # Sun's position
 
@@ -440,12 +542,13 @@ def get_alt_az(p, y):
     if (p in solar_system): # if the chosen object is in the solar system, use the keplerian method
         # Planet's orbital elements
 
-        N = math.radians(ref[p][0]%360)
-        i = math.radians(ref[p][1]%360)
-        w = math.radians(ref[p][2]%360)
-        a = ref[p][3]
-        e = ref[p][4]
-        M = math.radians(ref[p][5]%360)
+        k = solar_system.index(p) * 6
+        N = math.radians((orbit_base[k]   + orbit_rate[k]   * d)%360)
+        i = math.radians((orbit_base[k+1] + orbit_rate[k+1] * d)%360)
+        w = math.radians((orbit_base[k+2] + orbit_rate[k+2] * d)%360)
+        a = orbit_base[k+3] + orbit_rate[k+3] * d
+        e = orbit_base[k+4] + orbit_rate[k+4] * d
+        M = math.radians((orbit_base[k+5] + orbit_rate[k+5] * d)%360)
         
         # Eccentric anomaly E
 
@@ -496,35 +599,55 @@ def get_alt_az(p, y):
         if (p == "Mond"):
             rg =  rg * 6371 / 149597870.700
     elif (p in star_list):
-        RA  = math.radians(stars[p][0])
-        Dec = math.radians(stars[p][1])
+        k   = star_list.index(p) * 2
+        RA  = math.radians(star_coords[k])
+        Dec = math.radians(star_coords[k+1])
         
         rg = 0
         r  = 0
         
     elif (p in galaxy_list):
-        RA  = math.radians(galaxies[p][0])
-        Dec = math.radians(galaxies[p][1])
+        k   = galaxy_list.index(p) * 2
+        RA  = math.radians(galaxy_coords[k])
+        Dec = math.radians(galaxy_coords[k+1])
         
         rg = 0
         r  = 0        
 
-    # Local Sidereal Time LST
+    # Local Sidereal Time LST, from the Sun's mean longitude (GMST0)
     
-    LST = (math.degrees(lonsun)/15 + 12 + UT + local_lon/15)%24
+    LST = (math.degrees(Ms + ws)/15 + 12 + UT + local_lon/15)%24
 
     print("LST = " + repr(LST) + "h")
 
     # Azimuthal coordinates
 
-    observing_location = EarthLocation(lat=math.degrees(local_lat), lon=local_lon, height=417*u.m)  
-    observing_time = Time(datetime.datetime.utcnow(), scale='utc')
-    aa = AltAz(location=observing_location, obstime=observing_time)
-    RA_DEC = SkyCoord(RA, Dec, unit="rad")
-    RA_DEC = RA_DEC.transform_to(aa)
-    
-    az  = RA_DEC.az.deg
-    alt = RA_DEC.alt.deg
+    if slim:
+        # Hour angle, then rotate the equatorial coordinates into the
+        # horizon system
+        
+        HA = math.radians(LST * 15) - RA
+        
+        xa = math.cos(HA) * math.cos(Dec)
+        ya = math.sin(HA) * math.cos(Dec)
+        za = math.sin(Dec)
+        
+        xhor = xa * math.sin(local_lat) - za * math.cos(local_lat)
+        yhor = ya
+        zhor = xa * math.cos(local_lat) + za * math.sin(local_lat)
+        
+        az  = (math.degrees(math.atan2(yhor, xhor)) + 180)%360
+        alt = math.degrees(math.asin(zhor))
+    else:
+        iers_ready.wait() # local files only, never blocks on the network
+        observing_location = EarthLocation(lat=math.degrees(local_lat), lon=local_lon, height=417*u.m)  
+        observing_time = Time(datetime.datetime.utcnow(), scale='utc')
+        aa = AltAz(location=observing_location, obstime=observing_time)
+        RA_DEC = SkyCoord(RA, Dec, unit="rad")
+        RA_DEC = RA_DEC.transform_to(aa)
+        
+        az  = RA_DEC.az.deg
+        alt = RA_DEC.alt.deg
     
     if (p == "Sonne"):
         rg = r
@@ -534,6 +657,14 @@ def get_alt_az(p, y):
     print("r   = " + repr(rg) + " (AU)")
     print("Az  = " + repr(az) + "°")
     print("Alt = " + repr(alt) + "°")
+    if measure:
+        peak = tracemalloc.get_traced_memory()[1]
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        stats = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(snapshot.filter_traces(ignore), "lineno")
+        blocks = sum(stat.count_diff for stat in stats)
+        print("Mem = " + repr(get_rss()) + " kB, Update = " + repr(peak - traced) + " B peak, " + repr(blocks) + " blocks (" + ("slim" if slim else "full") + ")")
+    else:
+        print("Mem = " + repr(get_rss()) + " kB (" + ("slim" if slim else "full") + ")")
     return alt, az, RA, Dec, rg, r
     
     